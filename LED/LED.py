@@ -1,16 +1,25 @@
 """ Different effects for ws281x led strips 
 """
+import ctypes
 import time
-from rpi_ws281x import PixelStrip, RGBW
+from time import perf_counter
+import numpy as np
+from numba import njit, prange
+from rpi_ws281x import PixelStrip
 from enum import Enum
+from typing import Iterable, Iterator, Optional
 
 """ rpi_ws281x library for controlling led strip
 time library for time delaying
+ctypes library for accessing led buffer of the strip
+numpy library for precomputing color values of effects
+numba library for compiling frame computations
 """
 
 
 class Color(Enum):
-	""" Color definitions with RGB tuples.
+	""" Color definitions with RGB tuples. Each color also keeps its packed
+	24-bit value as packed attribute.
 	"""
 	RED = (255, 0, 0)
 	GREEN = (0, 255, 0)
@@ -20,8 +29,56 @@ class Color(Enum):
 	TURQUOISE = (48, 213, 200)
 	ORANGE = (255, 120, 0)
 	WHITE = (255, 255, 255)
+
+	def __init__(self, r: int, g: int, b: int):
+		# Packing RGB values to 24-bit color once at class load
+		self.packed = (r << 16) | (g << 8) | b
 	
 
+# Compiled helpers only take numpy arrays and scalars (nopython mode, GIL released).
+# Strip I/O stays in LED methods, since calling the strip would force object mode.
+@njit("void(float64[::1], int64[::1], int64[::1], uint8[:, ::1])", cache=True, nogil=True)
+def _interpFrames(frac, startRgb, endRgb, rgb):
+	""" Fills rgb with RGB values of each step of ramp from startRgb to endRgb
+
+	Parameters:
+		frac (float64 array): Ratio of each step in range 0-1
+		startRgb (int64 array): RGB values of color which is wanted to start
+		endRgb (int64 array): RGB values of color which is wanted to end
+		rgb (uint8 array): Buffer which have a row for each RGB value (shape [3, steps])
+	"""
+	for c in range(3):
+		for k in range(frac.size):
+			# Interpolating and checking each RGB value
+			value = int(startRgb[c] + frac[k] * (endRgb[c] - startRgb[c]))
+			rgb[c, k] = min(255, max(0, value))
+
+
+@njit("void(uint8[::1], uint8[::1], uint8[::1], uint32[::1])", cache=True, nogil=True)
+def _packRgb(r, g, b, out):
+	""" Fills out with 24-bit colors packed from seperately RGB values which using
+	bit-wise process (contiguous arrays let LLVM vectorize the loop)
+
+	Parameters:
+		r, g, b (uint8 array): Seperately color of RGB values
+		out (uint32 array): Buffer which have a value for each RGB value
+	"""
+	for i in range(out.size):
+		out[i] = (np.uint32(r[i]) << 16) | (np.uint32(g[i]) << 8) | np.uint32(b[i])
+
+
+@njit("void(uint32[::1], int64, uint32[::1])", parallel=True, cache=True, nogil=True)
+def _chaseFrame(order, shift, out):
+	""" Fills out with packed 24-bit colors of order which shifted shift pixels forward
+
+	Parameters:
+		order (uint32 array): Packed colors of the color array with repeat
+		shift (int): How many pixels colors moved forward (must be range in 0-order size)
+		out (uint32 array): Frame buffer which have a value for each pixel
+	"""
+	for j in prange(out.size):
+		out[j] = order[(j - shift) % order.size]
+
 
 	
 class LED:
@@ -34,15 +91,22 @@ class LED:
 		transition (startColor, endColor, effectSpeed):
 			Color transitions to endColor from startColor with effectSpeed
 		
-		transitionEffect (colors, effectSpeed):
-			Color transitions of colors array with effectSpeed
+		transitionEffect (colors, effectSpeed, fadeSpeed):
+			Color transitions of colors array with effectSpeed until CTRL + C pressed.
+			When pressed turns off the led with fadeSpeed.
 		
 		getRgbFromColor (color): 
 			Returns seperately RGB values from 24-bit color parameter which using bit-wise process
 		
+		packRgb (r, g, b):
+			Returns 24-bit color from seperately RGB values which using bit-wise process
+		
 		setLedColor (n,red, green, blue, white): 
 			Checks and sets RGB values
 		
+		setPixelColorPacked (n, packed):
+			Sets 24-bit color without checking
+		
 		turnOff (fadeSpeed): 
 			Turns off the led strip with fadeSpeed
 		
@@ -74,6 +138,19 @@ class LED:
 		# Initializing strip
 		self.strip.begin()
 
+		# C led buffer of the strip (None when rpi_ws281x does not expose it)
+		self._leds = self._ledView()
+
+		# Frame buffer of packed 24-bit colors which is reused by effects. If
+		# led buffer is exposed frames are written to it directly
+		if self._leds is not None:
+			self._frame = self._leds
+		else:
+			self._frame = np.empty(self.strip.numPixels(), dtype=np.uint32)
+
+		# Brightness ratios of turnOn steps for each (brightness, shineSpeed)
+		self._fracCache = {}
+
 	"""  ledCount: should be the number of pixels in the display (default 29)
 	
 	ledPin: should be the GPIO pin connected to the display signal line (must 
@@ -99,18 +176,24 @@ class LED:
 			shineSpeed (int): Shine speed while light on the led
 				(recommanded range is [1 - 6])
 		"""
-		# Splitting tuple to 3 values
-		r, g, b = color.value
+		# Ramping from off to color
+		self._ramp((0, 0, 0), color.value, shineSpeed)
+
+	def _frac(self, speed: int) -> np.ndarray:
+		""" Returns ratio of every ramp step, computed once for each brightness and speed
+
+		Parameters:
+			speed (int): Changing speed of the ramp
+
+		Returns:
+			frac (float array): Ratio of each step in range 0-1 (1 itself excluded)
+		"""
+		key = (self.brightness, speed)
+		if key not in self._fracCache:
+			self._fracCache[key] = np.arange(0, self.brightness, speed) / self.brightness
+
+		return self._fracCache[key]
 
-		# Setting and showing led pixels to which color needed
-		for i in range(0, self.brightness, shineSpeed):
-			for j in range(self.strip.numPixels()):
-				self.setLedColor(j, int(r * (i / self.brightness)), 
-									int(g * (i / self.brightness)), 
-									int(b * (i / self.brightness)))
-			self.strip.show()
-			time.sleep(1 / (self.delayMs*10))
-			
 	def transition(self, startColor: tuple, endColor: tuple, effectSpeed: int) -> None:
 		""" Color transitions to endColor from startColor with effectSpeed
 
@@ -122,40 +205,145 @@ class LED:
 			effectSpeed (int): Color changing speed while color transition
 				(recommanded range is [1 - 6])
 		"""
-
-		# Splitting tuple to 3 values
-		red, green, blue = startColor
-
-		# Splitting tuple to 3 values
-		targetRed, targetGreen, targetBlue = endColor
-
-		# Setting and showing led pixels to which color needed
-		for i in range(0, self.brightness, effectSpeed):
-			for j in range(self.strip.numPixels()):
-				self.setLedColor(j, int(red + (i * (targetRed - red) / self.brightness)), 
-									int(green + (i * (targetGreen - green) / self.brightness)),  
-									int(blue + (i * (targetBlue - blue) / self.brightness)))
-			self.strip.show()
-			time.sleep(1 / (self.delayMs*10))
+		self._ramp(startColor, endColor, effectSpeed)
 	
-	def transitionEffect(self, colors: list[tuple], effectSpeed: int) -> None:
-		""" Color transitions of colors array with effectSpeed 
+	def transitionEffect(self, colors: list[tuple], effectSpeed: int, fadeSpeed: int = 7) -> None:
+		""" Color transitions of colors array with effectSpeed until pressing CTRL + C.
+		When pressed turns off the led with fadeSpeed.
 
 		Parameters:
 			colors (list of colors): Colors of wanted to light on(it shoul be tuple array)
 				Ex: [(int, int, int), (int, int, int),...] (Each int value must be range in 0-255)
 			effectSpeed (int): Color changing speed while color transition
 				(recommanded range is [1 - 6])
+			fadeSpeed (int): Light off speed while brightness getting 0
+				(recommanded range is [3-8])
 
 		"""
+		try:
+			self._drive(self._frameStream(colors, effectSpeed))
+		except KeyboardInterrupt:
+			self.turnOff(fadeSpeed)
+
+	def _frameStream(self, colors: list[tuple], effectSpeed: int) -> Iterator[int]:
+		""" Yields packed 24-bit color of each transition step from first to last in
+		colors array endlessly
+
+		Parameters:
+			colors (list of colors): Colors of wanted to light on(it shoul be tuple array)
+			effectSpeed (int): Color changing speed while color transition
+		"""
+		# Precomputing packed colors of whole cycle from first to last in colors array
+		frac = self._frac(effectSpeed)
+		frames = np.concatenate([self._rampFrames(colors[i], colors[(i + 1) % len(colors)], frac)
+								 for i in range(len(colors))]).tolist()
 		while True:
-			# Providing transition effect with transition function from first to last in colors array 
-			for i in range(len(colors)):
-				if i + 1 >= len(colors):
-					self.transition(colors[i], colors[0],effectSpeed)
-				else:
-					self.transition(colors[i], colors[i + 1], effectSpeed)
-	
+			yield from frames
+
+	def _drive(self, stream: Iterable[int]) -> None:
+		""" Shows each packed 24-bit color of stream on all pixels, one frame per color
+
+		Parameters:
+			stream (iterable of int): 24-bit RGB values of frames
+		"""
+		# Hoisting loop invariants
+		fill = self._fill
+		show = self.strip.show
+		delay = 1 / (self.delayMs*10)
+		nextTime = perf_counter()
+
+		for packed in stream:
+			fill(packed)
+			show()
+			nextTime = self._wait(nextTime, delay)
+
+	def _ledView(self) -> Optional[np.ndarray]:
+		""" Returns uint32 array which aliases C led buffer (ws2811_channel_t.leds) of
+		the strip, so a whole frame is written without calling setPixelColor for each
+		pixel. Returns None when the binding does not expose the buffer.
+		"""
+		try:
+			import _rpi_ws281x as ws
+			address = int(ws.ws2811_channel_t_leds_get(self.strip._channel))
+		except (ImportError, AttributeError, TypeError):
+			return None
+		if not address:
+			return None
+
+		buffer = (ctypes.c_uint32 * self.strip.numPixels()).from_address(address)
+		return np.ctypeslib.as_array(buffer)
+
+	def _fill(self, packed: int) -> None:
+		""" Sets all pixels to packed 24-bit color
+
+		Parameters:
+			packed (int): 24-bit RGB value
+		"""
+		if self._leds is not None:
+			self._leds.fill(packed)
+		else:
+			setPixel = self.strip.setPixelColor
+			for j in range(self.strip.numPixels()):
+				setPixel(j, packed)
+
+	def _pushFrame(self) -> None:
+		""" Sets pixels to packed 24-bit colors of frame buffer (nothing to do when
+		frame buffer is led buffer of the strip)
+		"""
+		if self._leds is None:
+			setPixel = self.strip.setPixelColor
+			for j, packed in enumerate(self._frame.tolist()):
+				setPixel(j, packed)
+
+	def _rampFrames(self, startColor: tuple, endColor: tuple, frac: np.ndarray) -> np.ndarray:
+		""" Returns packed 24-bit color of each step of ramp to endColor from startColor
+
+		Parameters: 
+			startColor ((int, int, int)): RGB tuple value of color which is wanted to start
+			endColor ((int, int, int)): RGB tuple value of color which is wanted to end
+			frac (float array): Ratio of each step in range 0-1
+
+		Returns:
+			frames (uint32 array): 24-bit color of each step (all pixels have same color)
+		"""
+		rgb = np.empty((3, frac.size), dtype=np.uint8)
+		_interpFrames(frac, np.array(startColor, dtype=np.int64), np.array(endColor, dtype=np.int64), rgb)
+
+		frames = np.empty(frac.size, dtype=np.uint32)
+		_packRgb(rgb[0], rgb[1], rgb[2], frames)
+
+		return frames
+
+	def _ramp(self, startColor: tuple, endColor: tuple, speed: int) -> None:
+		""" Shows each step of ramp to endColor from startColor on all pixels and
+		finishes at endColor. turnOn, transition and turnOff are ramps.
+
+		Parameters: 
+			startColor ((int, int, int)): RGB tuple value of color which is wanted to start
+			endColor ((int, int, int)): RGB tuple value of color which is wanted to end
+			speed (int): Changing speed of the ramp
+		"""
+		frac = np.append(self._frac(speed), 1.0)
+		self._drive(self._rampFrames(startColor, endColor, frac).tolist())
+
+	def _wait(self, nextTime: float, delay: float) -> float:
+		""" Sleeps until delay seconds after nextTime, so frame timing does not drift
+		with the time spent on computing and showing frames
+
+		Parameters:
+			nextTime (float): perf_counter time of the previous frame
+			delay (float): Duration between frames in seconds
+
+		Returns:
+			nextTime (float): perf_counter time of the current frame
+		"""
+		nextTime += delay
+		remaining = nextTime - perf_counter()
+		if remaining > 0:
+			time.sleep(remaining)
+
+		return nextTime
+
 	def getRgbFromColor(self,color: int) -> tuple:
 		""" Returns seperately RGB values from 24-bit color parameter which using bit-wise process
 
@@ -171,6 +359,18 @@ class LED:
 		b = color & 0xFF
 
 		return r, g, b
+
+	def packRgb(self, r: int, g: int, b: int) -> int:
+		""" Returns 24-bit color from seperately RGB values which using bit-wise process
+
+		Parameters: 
+			r, g, b (int): Seperately color of RGB value (each value must be range in 0-255)
+
+		Returns:
+			color (int): 24-bit RGB value
+		"""
+		# Bit-wise processings
+		return (r << 16) | (g << 8) | b
 		
 	def setLedColor(self,n: int,red: int, green: int, blue: int, white: int = 0) -> None:
 		""" Checks and sets RGB values
@@ -182,23 +382,24 @@ class LED:
 			blue (int): Blue value of RGB color (must be range in 0-255 )
 			white (int): White value of RGB color (must be range in 0-255, default 0)
 		"""
-		
+
 		# Checking
-		if(red < 0):
-			red = 0
-		elif(red > 255):
-			red = 255
-		if(green < 0 ):
-			green = 0
-		elif(green > 255):
-			green = 255
-		if(blue < 0):
-			blue = 0
-		elif(blue > 255):
-			blue = 255
-
-		# Setting
-		self.strip.setPixelColor(n,RGBW(red, green, blue, white))
+		red = max(0, min(255, red))
+		green = max(0, min(255, green))
+		blue = max(0, min(255, blue))
+
+		# Setting as packed 32-bit color (white is the highest byte)
+		self.strip.setPixelColor(n, (white << 24) | (red << 16) | (green << 8) | blue)
+
+	def setPixelColorPacked(self, n: int, packed: int) -> None:
+		""" Sets 24-bit color without checking, for callers which already packed RGB values
+		with packRgb
+
+		Parameters: 
+			n (int): Which pixel want to light on 
+			packed (int): 24-bit RGB value
+		"""
+		self.strip.setPixelColor(n, packed)
 			
 	def turnOff(self,fadeSpeed: int) -> None:
 		""" Turn off the led strip with fadeSpeed  
@@ -210,20 +411,10 @@ class LED:
 
 		# Getting color from first pixel
 		color = self.strip.getPixelColor(0)
-		if not isinstance(color, int):
-			raise ValueError("Color should be a 24-bit integer value")
-		# Spiltting RGB values from color parameter
-		r, g, b = self.getRgbFromColor(color)
-
-		# Decreasing brightness each pixel untill 0  
-		while (r > 0 or g > 0 or b > 0):
-			r -= fadeSpeed
-			g -= fadeSpeed
-			b -= fadeSpeed
-			for i in range(self.strip.numPixels()):
-				self.setLedColor(i, r, g, b)
-			self.strip.show()
-			time.sleep(1 / (self.delayMs*10))
+		assert isinstance(color, int), "Color should be a 24-bit integer value"
+
+		# Ramping from color of first pixel to off
+		self._ramp(self.getRgbFromColor(color), (0, 0, 0), fadeSpeed)
 
 	def colorLoop(self, shineSpeed: int = 5, fadeSpeed: int = 7, effectSpeed: int = 3, colorOrder: list[Color] = [Color.GREEN, Color.BLUE, Color.RED]) -> None:
 		""" Turns on the led strip with first color and shineSpeed. Provides transition
@@ -243,10 +434,8 @@ class LED:
 		try:
 
 			self.turnOn(colorOrder[0],shineSpeed)
-			liste = []
-			for i in range(len(colorOrder)):
-				liste.append(colorOrder[i].value)
-			self.transitionEffect(liste,effectSpeed)
+			liste = [color.value for color in colorOrder]
+			self.transitionEffect(liste,effectSpeed, fadeSpeed)
 		except KeyboardInterrupt:
 			self.turnOff(fadeSpeed)
 
@@ -279,25 +468,34 @@ class LED:
 			effectSpeed (int): Color changing speed while color transition
 				(recommanded range is [1 - 6])
 		"""
+		# Hoisting loop invariants
+		numPixels = self.strip.numPixels()
+		setPixel = self.strip.setPixelColor
+		show = self.strip.show
+		delay = 1 / (self.delayMs*10)
+		wait = self._wait
+		nextTime = perf_counter()
+
+		# Packed 24-bit value of each color, computed once instead of every pass
+		packedOrder = [color.packed for color in colorOrder]
+
 		try:
 			while True:
 				
 				# Choosing color
-				for color in colorOrder:
+				for packed in packedOrder:
 					
-					# Setting led pixels to selected color
-					for j in range(self.strip.numPixels()):
-						
-						# Spiltting RGB values from color parameter
-						r, g, b = color.value
-						self.setLedColor(j, r, g, b)
-						self.strip.show()
-						time.sleep(1 / (self.delayMs*10))
+					# Setting led pixels to selected color one by one (one show per lit pixel)
+					for j in range(numPixels):
+						setPixel(j, packed)
+						show()
+						nextTime = wait(nextTime, delay)
 		except KeyboardInterrupt:
-			for i in range(self.strip.numPixels()):
-				self.setLedColor(i,0,0,0)
-				self.strip.show()
-				time.sleep(1 / (self.delayMs*10))
+			nextTime = perf_counter()
+			for i in range(numPixels):
+				setPixel(i, 0)
+				show()
+				nextTime = self._wait(nextTime, delay)
 
 	
 	def chase(self, colorOrder: list[Color]=[Color.GREEN, Color.BLUE, Color.RED], repeat: int=3, effectSpeed: int=4) -> None:
@@ -310,30 +508,39 @@ class LED:
 			effectSpeed (int): Color changing speed while color transition
 				(recommanded range is [1 - 6])
 		"""
+		# Hoisting loop invariants
+		numPixels = self.strip.numPixels()
+		setPixel = self.strip.setPixelColor
+		show = self.strip.show
+		delay = 1 / (self.delayMs*10)
+		nextTime = perf_counter()
+
 		try:
-			# Backs up the color array
-			order = []
-			for color in colorOrder:
-				for i in range(repeat):
-					order.append(color.value)
+			# Backs up packed colors of the color array with repeat
+			order = np.array([color.packed for color in colorOrder for _ in range(repeat)], dtype=np.uint32)
+
+			# How many pixels colors moved forward
+			shift = 0
+
+			# Reused frame buffer of packed 24-bit colors
+			frame = self._frame
+			pushFrame = self._pushFrame
 			while True:
+				# Looking up packed colors of the frame
+				_chaseFrame(order, shift, frame)
+
 				# Sets and shows led pixels for each color with repeat
-				for i in range(self.strip.numPixels()):
-					for j in range(len(order)):
-						r, g, b = order[i % (j+1)]
-						self.setLedColor(i, r, g, b)
-						self.strip.show()
-				time.sleep(1 / (self.delayMs*10))
-					
-				if len(order) > 1:
-					last_color = order[-1]
-					for k in range(len(order) - 1, 0, -1):
-						order[k] = order[k - 1]
-					order[0] = last_color
+				pushFrame()
+				show()
+				nextTime = self._wait(nextTime, delay)
+
+				# Shifting colors one pixel forward
+				shift = (shift + 1) % len(order)
 				
 				
 		except KeyboardInterrupt:
-			for i in range(self.strip.numPixels()):
-				self.setLedColor(i, 0, 0, 0)
-				self.strip.show()
-				time.sleep(1 / (self.delayMs*10))
+			nextTime = perf_counter()
+			for i in range(numPixels):
+				setPixel(i, 0)
+				show()
+				nextTime = self._wait(nextTime, delay)
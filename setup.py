@@ -6,6 +6,8 @@ setup(
     packages=find_packages(),
     install_requires=[
         'rpi_ws281x',
+        'numpy',
+        'numba',
     ],
     entry_points={
         'console_scripts': [